@@ -5,12 +5,22 @@ from tkinter import ttk, filedialog, simpledialog, messagebox
 import os
 import sys
 import subprocess
-import socket
+import concurrent.futures
 
 # Import the TabyController from taby_controller.py
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from taby_controller import TabyController
 
+# Refresh timing: start here, drop to the minimum on change, back off while idle
+INITIAL_REFRESH_INTERVAL_MS = 2000
+MIN_REFRESH_INTERVAL_MS = 1000
+
+# How often the Tk loop checks on work handed to the background pool
+FUTURE_POLL_MS = 50
+
+# Extra queue rows rendered below the viewport so small scrolls need no inserts
+QUEUE_WINDOW_BUFFER = 5
+
 class TabyGUI:
     def __init__(self, root):
         self.root = root
@@ -18,11 +28,30 @@ class TabyGUI:
         self.root.geometry("900x500")  # Increased width to accommodate more columns
         
         # Initialize controller with minimal default settings
-        self.controller = TabyController(self.get_default_args())
+        args = self.get_default_args()
+        self.controller = TabyController(args)
+        self.max_refresh_interval_ms = args.max_refresh_interval_ms
+        
+        # Last painted rows, used to diff each refresh against
+        self._tree_state = {}
+        self._queue_data = ()
+        self._queue_rendered = set()
+        self._queue_top = 0
+        
+        self._refresh_interval_ms = INITIAL_REFRESH_INTERVAL_MS
+        self._refresh_job = None
+        
+        # Slow subprocess work (pacmd, yt-dlp) runs here, never on the Tk thread
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self._src_map = {}
+        self._pacmd_future = None
+        self._start_future = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.setup_ui()
         self.update_displays()
-        self.root.after(5000, self.schedule_updates)
+        if self._refresh_job is None:
+            self._refresh_job = self.root.after(self._refresh_interval_ms, self.schedule_updates)
     
     def get_default_args(self):
         # Create a simple object with default attributes
@@ -38,8 +67,10 @@ class TabyGUI:
                 self.audio_quality = "bestaudio"
                 self.stream_bitrate = 128
                 self.stream_codec = "mp3"
+                self.network_caching = 1000
                 self.url = None
                 self.playlist = None
+                self.max_refresh_interval_ms = 30000
         return Args()
     
     def setup_ui(self):
@@ -102,12 +133,17 @@ class TabyGUI:
         queue_frame = ttk.Frame(notebook)
         notebook.add(queue_frame, text="Queue")
         
-        self.queue_listbox = tk.Listbox(queue_frame)
-        queue_scrollbar = ttk.Scrollbar(queue_frame, orient=tk.VERTICAL, command=self.queue_listbox.yview)
-        self.queue_listbox.configure(yscroll=queue_scrollbar.set)
+        # Virtual list: only the rows in view exist as tree items (iid = queue id), the scrollbar tracks the full queue
+        self.queue_tree = ttk.Treeview(queue_frame, show="tree", selectmode="browse")
+        self.queue_scrollbar = ttk.Scrollbar(queue_frame, orient=tk.VERTICAL, command=self.scroll_queue)
         
-        self.queue_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        queue_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.queue_tree.bind("<Configure>", lambda e: self.repopulate_queue_window())
+        self.queue_tree.bind("<MouseWheel>", self.on_queue_wheel)
+        self.queue_tree.bind("<Button-4>", self.on_queue_wheel)
+        self.queue_tree.bind("<Button-5>", self.on_queue_wheel)
+        
+        self.queue_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.queue_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         queue_btn_frame = ttk.Frame(queue_frame)
         queue_btn_frame.pack(fill=tk.X, pady=5)
@@ -119,11 +155,12 @@ class TabyGUI:
         self.status_var = tk.StringVar()
         status_bar = ttk.Label(frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         status_bar.pack(fill=tk.X, pady=(5, 0))
+        
+        self.build_options_dialog()
     
     def check_port_availability(self, port):
         """Check if a port is available for use."""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            return s.connect_ex(('localhost', port)) != 0
+        return self.controller.check_port_availability(port)
     
     def add_url(self):
         url = self.url_entry.get().strip()
@@ -144,30 +181,27 @@ class TabyGUI:
             else:
                 messagebox.showerror("Error", "Failed to add URL to queue")
     
-    def show_options_dialog(self):
+    def build_options_dialog(self):
+        # Built once and kept withdrawn; show_options_dialog only resets and re-shows it
         dialog = tk.Toplevel(self.root)
+        dialog.withdraw()
         dialog.title("Stream Options")
         dialog.geometry("300x200")
         dialog.transient(self.root)
-        dialog.grab_set()
+        dialog.protocol("WM_DELETE_WINDOW", lambda: self.close_options_dialog(False))
         
         ttk.Label(dialog, text="Audio Quality:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
         quality = ttk.Combobox(dialog, values=["bestaudio", "bestaudio[ext=m4a]", "worstaudio"])
-        quality.current(0)
         quality.grid(row=0, column=1, padx=5, pady=5)
         
         ttk.Label(dialog, text="Stream Codec:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
         codec = ttk.Combobox(dialog, values=["mp3", "opus", "vorb", "flac"])
-        codec.current(0)
         codec.grid(row=1, column=1, padx=5, pady=5)
         
         ttk.Label(dialog, text="Bitrate (kbps):").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
         bitrate = ttk.Spinbox(dialog, from_=64, to=320, increment=32)
-        bitrate.insert(0, "128")
         bitrate.grid(row=2, column=1, padx=5, pady=5)
         
-        result = {"confirmed": False}
-        
         def on_ok():
             try:
                 # Validate bitrate is a number
@@ -179,19 +213,33 @@ class TabyGUI:
                 self.controller.settings["audio_quality"] = quality.get()
                 self.controller.settings["stream_codec"] = codec.get()
                 self.controller.settings["stream_bitrate"] = bitrate_val
-                result["confirmed"] = True
-                dialog.destroy()
+                self.close_options_dialog(True)
             except ValueError:
                 messagebox.showerror("Invalid Bitrate", "Bitrate must be a number")
         
-        def on_cancel():
-            dialog.destroy()
-        
         ttk.Button(dialog, text="OK", command=on_ok).grid(row=3, column=0, padx=5, pady=10)
-        ttk.Button(dialog, text="Cancel", command=on_cancel).grid(row=3, column=1, padx=5, pady=10)
+        ttk.Button(dialog, text="Cancel", command=lambda: self.close_options_dialog(False)).grid(row=3, column=1, padx=5, pady=10)
         
-        self.root.wait_window(dialog)
-        return result["confirmed"]
+        self._opts_dialog = dialog
+        self._opts_widgets = (quality, codec, bitrate)
+        self._opts_result = tk.BooleanVar(value=False)
+    
+    def show_options_dialog(self):
+        quality, codec, bitrate = self._opts_widgets
+        quality.current(0)
+        codec.current(0)
+        bitrate.delete(0, tk.END)
+        bitrate.insert(0, "128")
+        
+        self._opts_dialog.deiconify()
+        self._opts_dialog.grab_set()
+        self.root.wait_variable(self._opts_result)
+        return self._opts_result.get()
+    
+    def close_options_dialog(self, confirmed):
+        self._opts_dialog.grab_release()
+        self._opts_dialog.withdraw()
+        self._opts_result.set(confirmed)
     
     def load_playlist(self):
         playlist_file = filedialog.askopenfilename(
@@ -203,8 +251,14 @@ class TabyGUI:
                 # Use a safe approach for Linux
                 self.root.config(cursor="")
                 self.update_displays()
-                self.controller.load_playlist(playlist_file)
-                self.update_displays()
+                # Unmap the queue while it is refilled so Tk lays it out once, not per row
+                pack_info = self.queue_tree.pack_info()
+                self.queue_tree.pack_forget()
+                try:
+                    self.controller.load_playlist(playlist_file)
+                    self.update_displays()
+                finally:
+                    self.queue_tree.pack(pack_info, before=self.queue_scrollbar)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load playlist: {str(e)}")
             finally:
@@ -221,8 +275,8 @@ class TabyGUI:
     
     def stop_all(self):
         if messagebox.askyesno("Confirm", "Are you sure you want to stop all streams?"):
-            for instance in list(self.controller.instances):
-                self.controller.stop_instance(instance["id"])
+            if not self.controller.stop_all_instances():
+                messagebox.showerror("Error", "Failed to stop some streams")
             self.update_displays()
     
     def start_next(self):
@@ -235,78 +289,203 @@ class TabyGUI:
                                f"Maximum number of concurrent instances ({self.controller.settings['max_concurrent']}) reached")
             return
             
+        if self._start_future is not None:
+            messagebox.showinfo("Starting", "A stream is already starting, please wait")
+            return
+        
+        # start_next fetches the title and waits for PulseAudio, so keep it off the Tk thread
+        self._start_future = self._executor.submit(self.controller.start_next)
+        self.root.after(FUTURE_POLL_MS, self._apply_start, self._start_future)
+    
+    def _apply_start(self, fut):
+        if not fut.done():
+            self.root.after(FUTURE_POLL_MS, self._apply_start, fut)
+            return
+        
+        self._start_future = None
         try:
-            # Fix for the controller bug - temporary workaround
-            if len(self.controller.queue) > 0:
-                next_item = self.controller.queue[0]
-                if self.controller.start_taby(next_item["url"], self.controller.next_instance_id):
-                    self.controller.next_instance_id += 1
-                    self.controller.remove_from_queue(next_item["id"])
-                    self.update_displays()
-                else:
-                    messagebox.showerror("Error", "Failed to start stream")
+            if not fut.result():
+                messagebox.showerror("Error", "Failed to start stream")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start next item: {str(e)}")
+        self.update_displays()
     
     def remove_from_queue(self):
-        selected = self.queue_listbox.curselection()
+        selected = self.queue_tree.selection()
         if selected:
-            queue_id = self.controller.queue[selected[0]]["id"]
+            queue_id = int(selected[0])
             self.controller.remove_from_queue(queue_id)
             self.update_displays()
     
     def update_displays(self):
         self.controller.clean_instances()
         
-        # Update instances
-        for item in self.instances_tree.get_children():
-            self.instances_tree.delete(item)
+        # Paint right away with the last known titles; fresh ones arrive asynchronously
+        self.request_source_descriptions()
+        return self.paint_displays()
+    
+    def paint_displays(self):
+        src_map = self._src_map
         
-        for instance in self.controller.instances:
+        # Build the desired rows keyed by instance id
+        # Snapshot the dicts first: start_next may be adding or removing entries from the executor thread
+        new_state = {}
+        for instance in list(self.controller.instances.values()):
             # Get the monitor name by appending .monitor to sink_name
             monitor_name = f"{instance['sink_name']}.monitor"
             
-            # Get the friendly name from logs or use a default
-            friendly_name = "Unknown"
-            try:
-                # Try to get the friendly name by running pacmd list-sources and parsing output
-                output = subprocess.check_output(["pacmd", "list-sources"], text=True)
-                for line in output.splitlines():
-                    if line.strip().startswith("name:") and f"<{instance['source_name']}>" in line:
-                        # Found the source, now look for device.description
-                        source_section = output[output.find(line):]
-                        for prop_line in source_section.splitlines():
-                            if "device.description" in prop_line:
-                                friendly_name = prop_line.split("=")[1].strip().strip('"')
-                                break
-                        break
-            except Exception as e:
-                # If we can't get the friendly name, use a fallback
-                friendly_name = f"Stream {instance['id']}"
+            # Get the friendly name from PulseAudio or use a fallback
+            friendly_name = src_map.get(instance['source_name'], f"Stream {instance['id']}")
             
-            self.instances_tree.insert("", tk.END, values=(
+            new_state[str(instance["id"])] = (
                 instance["id"],
                 instance["url"],
                 friendly_name,  # Use friendly name instead of source_name
                 friendly_name,  # Use friendly name instead of sink_name
                 friendly_name,  # Use friendly name instead of monitor_name
                 friendly_name   # Add friendly name as a separate column
-            ))
-        
-        # Update queue
-        self.queue_listbox.delete(0, tk.END)
-        for item in self.controller.queue:
-            self.queue_listbox.insert(tk.END, item["url"])
+            )
+        
+        changed = False
+        
+        # Hide the columns during bulk inserts (cheapest Treeview freeze) and restore the scroll position after
+        bulk_insert = len(new_state.keys() - self._tree_state.keys()) > 1
+        if bulk_insert:
+            scroll_top = self.instances_tree.yview()[0]
+            self.instances_tree.configure(displaycolumns=())
+        
+        # Reconcile the tree against the last painted rows, touching only what changed
+        for iid in self._tree_state.keys() - new_state.keys():
+            self.instances_tree.delete(iid)
+            changed = True
+        for iid, values in new_state.items():
+            old_values = self._tree_state.get(iid)
+            if old_values is None:
+                self.instances_tree.insert("", tk.END, iid=iid, values=values)
+                changed = True
+            elif old_values != values:
+                self.instances_tree.item(iid, values=values)
+                changed = True
+        self._tree_state = new_state
+        
+        if bulk_insert:
+            self.instances_tree.configure(displaycolumns="#all")
+            self.instances_tree.yview_moveto(scroll_top)
+        
+        # Update queue only when its contents changed
+        queue_data = tuple((queue_id, item["url"]) for queue_id, item in list(self.controller.queue.items()))
+        if queue_data != self._queue_data:
+            self._queue_data = queue_data
+            self.repopulate_queue_window()
+            changed = True
         
         # Update status
         self.status_var.set(
             f"Active: {len(self.controller.instances)}/{self.controller.settings['max_concurrent']} | "
             f"Queue: {len(self.controller.queue)}"
         )
+        
+        # Something moved: poll quickly again until things settle
+        if changed:
+            self.reset_refresh_interval()
+        return changed
+    
+    def queue_visible_rows(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        return max(1, self.queue_tree.winfo_height() // row_height)
+    
+    def repopulate_queue_window(self):
+        data = self._queue_data
+        rows = self.queue_visible_rows()
+        self._queue_top = max(0, min(self._queue_top, len(data) - rows))
+        first = self._queue_top
+        window = [str(queue_id) for queue_id, url in data[first:first + rows + QUEUE_WINDOW_BUFFER]]
+        
+        # iids are queue ids, so popping the head or appending touches one row rather than the whole window
+        wanted = set(window)
+        stale = [iid for iid in self._queue_rendered if iid not in wanted]
+        if stale:
+            self.queue_tree.delete(*stale)
+            self._queue_rendered.difference_update(stale)
+        added = False
+        for position, iid in enumerate(window):
+            if iid not in self._queue_rendered:
+                self.queue_tree.insert("", position, iid=iid, text=data[first + position][1])
+                self._queue_rendered.add(iid)
+                added = True
+        if stale or added:
+            self.queue_tree.yview_moveto(0)
+        
+        if data:
+            self.queue_scrollbar.set(first / len(data), min(first + rows, len(data)) / len(data))
+        else:
+            self.queue_scrollbar.set(0, 1)
+    
+    def scroll_queue(self, action, amount, unit=None):
+        if action == "moveto":
+            self._queue_top = int(float(amount) * len(self._queue_data))
+        else:
+            step = self.queue_visible_rows() if unit == "pages" else 1
+            self._queue_top += int(amount) * step
+        self.repopulate_queue_window()
+    
+    def on_queue_wheel(self, event):
+        self.scroll_queue("scroll", -3 if event.num == 4 or event.delta > 0 else 3, "units")
+        return "break"
+    
+    def request_source_descriptions(self):
+        if self._pacmd_future is not None:
+            return
+        self._pacmd_future = self._executor.submit(self.get_source_descriptions)
+        self.root.after(FUTURE_POLL_MS, self._apply_pacmd, self._pacmd_future)
+    
+    def _apply_pacmd(self, fut):
+        if not fut.done():
+            self.root.after(FUTURE_POLL_MS, self._apply_pacmd, fut)
+            return
+        
+        self._pacmd_future = None
+        src_map = fut.result()
+        if src_map != self._src_map:
+            self._src_map = src_map
+            self.paint_displays()
+    
+    def get_source_descriptions(self):
+        """Map PulseAudio source names to their device.description."""
+        src_map = {}
+        try:
+            output = subprocess.check_output(["pacmd", "list-sources"], text=True)
+        except Exception:
+            return src_map
+        
+        # pacmd uses fixed "name: <...>" and "key = value" delimiters, so plain string ops suffice
+        current = None
+        for line in output.splitlines():
+            line = line.strip()
+            if line.startswith("name: <"):
+                current = line[7:].partition(">")[0]
+            elif line.startswith("device.description = ") and current is not None and current not in src_map:
+                src_map[current] = line.partition(" = ")[2].strip('"')
+        return src_map
+    
+    def reset_refresh_interval(self):
+        self._refresh_interval_ms = MIN_REFRESH_INTERVAL_MS
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+        self._refresh_job = self.root.after(self._refresh_interval_ms, self.schedule_updates)
     
     def schedule_updates(self):
-        self.update_displays()
-        self.root.after(5000, self.schedule_updates)
+        self._refresh_job = None
+        # A change re-arms the timer itself; otherwise back off towards the maximum
+        if not self.update_displays():
+            self._refresh_interval_ms = min(self._refresh_interval_ms * 2, self.max_refresh_interval_ms)
+            self._refresh_job = self.root.after(self._refresh_interval_ms, self.schedule_updates)
+    
+    def on_close(self):
+        # Release a pending wait_variable in show_options_dialog, or it would never return
+        self.close_options_dialog(False)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
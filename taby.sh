@@ -23,16 +23,23 @@ AUDIO_QUALITY="bestaudio"
 STREAM_BITRATE="128"
 STREAM_CODEC="mp3"
 YT_DLP_TIMEOUT=60  # Timeout in seconds for yt-dlp
+NETWORK_CACHING=1000  # Input buffer in ms for the main player (VLC's own default)
+CAPTURE_LATENCY_MSEC=40  # PulseAudio buffer for the streamers reading the sink monitor
+STREAM_URL=""      # Pre-resolved stream URL; skips the yt-dlp lookup when set
+YT_DLP_FAST_ARGS=(--youtube-skip-dash-manifest)  # Keep in sync with YTDLP_FAST_ARGS in taby_controller.py
 
 # Parse arguments
 [[ "$1" == "-h" || "$1" == "--help" || -z "$1" ]] && {
-    echo "Usage: $0 <youtube_url> [--rtsp-port PORT] [--http-port PORT] [--no-streaming] [--sink-name NAME] [--source-name NAME] [--audio-quality QUALITY] [--stream-bitrate BITRATE] [--stream-codec CODEC]"
+    echo "Usage: $0 <youtube_url> [--rtsp-port PORT] [--http-port PORT] [--no-streaming] [--sink-name NAME] [--source-name NAME] [--audio-quality QUALITY] [--stream-bitrate BITRATE] [--stream-codec CODEC] [--network-caching MS] [--stream-url URL]"
     echo "Options:"
     echo "  --audio-quality QUALITY    Audio quality for yt-dlp (e.g., 'bestaudio', 'bestaudio[ext=m4a]', 'bestaudio[height<=480]')"
+    echo "                             DASH manifests are skipped for speed, so DASH-only formats cannot be selected"
     echo "  --stream-bitrate BITRATE   Bitrate for HTTP/RTSP streaming in kb/s (default: 128)"
     echo "  --stream-codec CODEC       Audio codec for streaming (default: mp3, options: mp3, opus, vorb, flac)"
+    echo "  --network-caching MS       Input buffer of the main player in milliseconds (default: 1000)"
     echo "  --sink-name NAME           PulseAudio sink name (max 15 chars, default: ts_music_sink)"
     echo "  --source-name NAME         PulseAudio source name (max 15 chars, default: TS_Music_Bot)"
+    echo "  --stream-url URL           Direct audio stream URL already resolved by the caller (skips yt-dlp)"
     exit 1
 }
 
@@ -101,6 +108,16 @@ while [[ $# -gt 0 ]]; do
                 *) echo "ERROR: Unsupported codec. Use mp3, opus, vorb, or flac"; exit 1 ;;
             esac
             ;;
+        --network-caching)
+            if [[ "$2" =~ ^[0-9]+$ ]]; then
+                NETWORK_CACHING="$2"
+            else
+                echo "ERROR: Invalid network caching. Must be a number of milliseconds"
+                exit 1
+            fi
+            shift 2
+            ;;
+        --stream-url) STREAM_URL="$2"; shift 2 ;;
         *) echo "ERROR: Unknown option: $1"; exit 1 ;;
     esac
 done
@@ -164,48 +181,83 @@ cleanup() {
 trap cleanup EXIT INT TERM
 
 # Get stream URL with timeout
-echo "Retrieving stream URL (timeout: ${YT_DLP_TIMEOUT}s)..."
-STREAM_URL=""
-timeout $YT_DLP_TIMEOUT yt-dlp -f "$AUDIO_QUALITY" -g "$YOUTUBE_URL" > /tmp/yt_url.$$ 2>/dev/null
-if [ $? -ne 0 ]; then
-    echo "ERROR: Failed to get stream URL (timeout or yt-dlp error)"
-    cleanup
-fi
+resolve_stream_url() {
+    echo "Retrieving stream URL (timeout: ${YT_DLP_TIMEOUT}s)..."
+    timeout $YT_DLP_TIMEOUT yt-dlp "${YT_DLP_FAST_ARGS[@]}" -f "$AUDIO_QUALITY" -g "$YOUTUBE_URL" > /tmp/yt_url.$$ 2>/dev/null
+    if [ $? -ne 0 ]; then
+        echo "ERROR: Failed to get stream URL (timeout or yt-dlp error)"
+        cleanup
+    fi
+    
+    STREAM_URL=$(cat /tmp/yt_url.$$ | head -1)
+    rm -f /tmp/yt_url.$$
+    
+    if [[ -z "$STREAM_URL" ]]; then
+        echo "ERROR: Failed to get stream URL"
+        cleanup
+    fi
+}
 
-STREAM_URL=$(cat /tmp/yt_url.$$ | head -1)
-rm -f /tmp/yt_url.$$
+# Start the main player and wait for it to initialize; fails if VLC exits meanwhile
+start_player() {
+    PULSE_SINK=$SINK_NAME cvlc --no-video --volume=256 --network-caching=$NETWORK_CACHING "$STREAM_URL" &>/dev/null &
+    VLC_PID=$!
+    
+    echo "Waiting for VLC to initialize..."
+    for i in {1..10}; do
+        if ! ps -p "$VLC_PID" &>/dev/null; then
+            return 1
+        fi
+        sleep 0.5
+    done
+}
 
-if [[ -z "$STREAM_URL" ]]; then
-    echo "ERROR: Failed to get stream URL"
-    cleanup
+# The caller may have resolved the stream URL already
+PRE_RESOLVED=""
+if [[ -n "$STREAM_URL" ]]; then
+    echo "Using pre-resolved stream URL"
+    PRE_RESOLVED=1
+else
+    resolve_stream_url
 fi
 
 echo "Starting main audio player..."
-PULSE_SINK=$SINK_NAME cvlc --no-video --volume=256 "$STREAM_URL" &>/dev/null &
-VLC_PID=$!
-
-# Wait for VLC to initialize
-echo "Waiting for VLC to initialize..."
-for i in {1..10}; do
-    if ! ps -p "$VLC_PID" &>/dev/null; then
+if ! start_player; then
+    # A pre-resolved URL may have gone stale (or be bound to another address): ask yt-dlp once
+    if [[ -n "$PRE_RESOLVED" ]]; then
+        echo "WARNING: Pre-resolved stream URL failed, retrieving a fresh one"
+        resolve_stream_url
+        start_player || { echo "ERROR: VLC failed to start"; cleanup; }
+    else
         echo "ERROR: VLC failed to start"
         cleanup
     fi
-    sleep 0.5
-done
+fi
 
 # Set volume levels
 echo "Setting volume levels..."
 pactl set-sink-volume $SINK_NAME 100%
 pactl set-source-volume $SOURCE_NAME 100%
 
-# Start RTSP streaming if enabled
-if [[ -n "$RTSP_PORT" ]]; then
-    echo "Starting RTSP server on port $RTSP_PORT..."
-    cvlc -vvv pulse://$SINK_NAME.monitor \
+# Streamer launchers, shared by the initial start and the supervisor's restarts
+start_rtsp() {
+    PULSE_LATENCY_MSEC=$CAPTURE_LATENCY_MSEC cvlc --no-sout-video pulse://$SINK_NAME.monitor \
         --sout "#transcode{acodec=$STREAM_CODEC,ab=$STREAM_BITRATE}:rtp{sdp=rtsp://:$RTSP_PORT$RTSP_PATH}" \
         --sout-keep &>/dev/null &
     RTSP_VLC_PID=$!
+}
+
+start_http() {
+    PULSE_LATENCY_MSEC=$CAPTURE_LATENCY_MSEC cvlc --no-sout-video pulse://$SINK_NAME.monitor \
+        --sout "#transcode{vcodec=none,acodec=$STREAM_CODEC,ab=$STREAM_BITRATE}:http{mux=ogg,dst=:$HTTP_PORT/stream.ogg}" \
+        --sout-keep &>/dev/null &
+    HTTP_VLC_PID=$!
+}
+
+# Start RTSP streaming if enabled
+if [[ -n "$RTSP_PORT" ]]; then
+    echo "Starting RTSP server on port $RTSP_PORT..."
+    start_rtsp
     
     # Verify RTSP server started
     sleep 2
@@ -220,10 +272,7 @@ fi
 # Start HTTP streaming if enabled
 if [[ -n "$HTTP_PORT" ]]; then
     echo "Starting HTTP server on port $HTTP_PORT..."
-    cvlc -vvv pulse://$SINK_NAME.monitor \
-        --sout "#transcode{vcodec=none,acodec=$STREAM_CODEC,ab=$STREAM_BITRATE}:http{mux=ogg,dst=:$HTTP_PORT/stream.ogg}" \
-        --sout-keep &>/dev/null &
-    HTTP_VLC_PID=$!
+    start_http
     
     # Verify HTTP server started
     sleep 2
@@ -238,32 +287,33 @@ fi
 echo "✓ Audio pipeline ready! Select '$SOURCE_NAME' as your TeamSpeak mic"
 echo "Press Ctrl+C to stop"
 
-# Monitor all processes
+# Monitor all processes: sleep until one of them exits instead of polling with ps
+# (wait -n needs bash 4.3; older shells fall back to checking every 2 seconds)
 while true; do
+    if (( BASH_VERSINFO[0] * 100 + BASH_VERSINFO[1] >= 403 )); then
+        wait -n
+    else
+        sleep 2
+    fi
+    
     # Check if main VLC process is still running
-    if ! ps -p "$VLC_PID" &>/dev/null; then
+    if ! kill -0 "$VLC_PID" 2>/dev/null; then
         echo "Main VLC process terminated"
         break
     fi
     
     # Check streaming processes if they were started
-    if [[ -n "$RTSP_VLC_PID" ]] && ! ps -p "$RTSP_VLC_PID" &>/dev/null; then
+    if [[ -n "$RTSP_VLC_PID" ]] && ! kill -0 "$RTSP_VLC_PID" 2>/dev/null; then
         echo "WARNING: RTSP streaming process terminated, restarting..."
-        cvlc -vvv pulse://$SINK_NAME.monitor \
-            --sout "#transcode{acodec=$STREAM_CODEC,ab=$STREAM_BITRATE}:rtp{sdp=rtsp://:$RTSP_PORT$RTSP_PATH}" \
-            --sout-keep &>/dev/null &
-        RTSP_VLC_PID=$!
+        sleep 2  # Don't spin if it keeps dying straight away
+        start_rtsp
     fi
     
-    if [[ -n "$HTTP_VLC_PID" ]] && ! ps -p "$HTTP_VLC_PID" &>/dev/null; then
+    if [[ -n "$HTTP_VLC_PID" ]] && ! kill -0 "$HTTP_VLC_PID" 2>/dev/null; then
         echo "WARNING: HTTP streaming process terminated, restarting..."
-        cvlc -vvv pulse://$SINK_NAME.monitor \
-            --sout "#transcode{vcodec=none,acodec=$STREAM_CODEC,ab=$STREAM_BITRATE}:http{mux=ogg,dst=:$HTTP_PORT/stream.ogg}" \
-            --sout-keep &>/dev/null &
-        HTTP_VLC_PID=$!
+        sleep 2  # Don't spin if it keeps dying straight away
+        start_http
     fi
-    
-    sleep 2
 done
 
 echo "Stream ended"
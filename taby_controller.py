@@ -1,17 +1,110 @@
 #!/usr/bin/env python3
 
-import argparse, os, subprocess, signal, sqlite3, sys, time, re, socket
+import argparse, atexit, json, os, pathlib, queue, selectors, subprocess, signal, sqlite3, sys, threading, time, re, socket
+import concurrent.futures, itertools
+import urllib.parse
 from datetime import datetime
 
+# Hot-path statements kept as shared constants so every call hits sqlite3's statement cache
+SQL_INSERT_QUEUE = "INSERT INTO queue (url) VALUES (?)"
+SQL_DELETE_QUEUE = "DELETE FROM queue WHERE id = ?"
+SQL_INSERT_INSTANCE = "INSERT INTO instances VALUES (?,?,?,?,?,?,?,CURRENT_TIMESTAMP)"
+SQL_DELETE_INSTANCE = "DELETE FROM instances WHERE id = ?"
+INSTANCE_COLUMNS = "id, url, rtsp_port, http_port, sink_name, source_name, pid"
+
+# How long (seconds) a port probe result is reused before probing again
+PORT_CHECK_TTL = 5
+
+# Extra yt-dlp arguments for every lookup: taby only plays progressive audio formats, so the DASH
+# manifest download and parse is skipped (formats that exist only in the DASH manifest are unavailable)
+YTDLP_FAST_ARGS = ["--youtube-skip-dash-manifest"]
+
+# How long (seconds) cached yt-dlp metadata is trusted before asking YouTube again
+METADATA_TTL = 24 * 3600
+# Cached direct stream URLs are dropped this many seconds before their own expire= time
+STREAM_URL_MARGIN = 300
+
+# How long (seconds) start_taby waits for taby.sh's PulseAudio devices, and how often it looks
+PULSE_WAIT_TIMEOUT = 5.0
+PULSE_POLL_INTERVAL = 0.05
+
+# Seconds the interactive prompt waits for input before re-checking instances
+REPL_POLL_INTERVAL = 1.0
+
+# Read buffer for playlist files: a typical playlist is consumed in a single read() call
+PLAYLIST_READ_BUFFER = 1 << 20
+
+# Characters stripped from PulseAudio device descriptions; whitespace of any kind becomes "_", since
+# descriptions are written as pacmd command lines where a newline or tab would split the command
+SAFE_DESCRIPTION_RE = re.compile(r'[^\w\s\-_\.,]')
+SAFE_WHITESPACE_RE = re.compile(r'\s')
+# Same filter for ASCII text as a bytes.translate table: drop and whitespace-to-underscore in one C pass
+_ASCII_WHITESPACE = bytes(c for c in range(128) if chr(c).isspace())
+SAFE_DESCRIPTION_TABLE = bytes.maketrans(_ASCII_WHITESPACE, b"_" * len(_ASCII_WHITESPACE))
+SAFE_DESCRIPTION_DROP = bytes(c for c in range(128) if SAFE_DESCRIPTION_RE.match(chr(c)))
+
+def _playlist_iter(path):
+    """Yield (url,) rows from a playlist file, one line at a time."""
+    with open(path, 'r', buffering=PLAYLIST_READ_BUFFER) as f:
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith('#'):
+                continue
+            if not url.startswith(('http://', 'https://')):
+                print(f"Invalid URL format: {url}")
+                continue
+            yield (url,)
+
+def _video_id(url):
+    """Return the YouTube video id in url, or the url itself when there is none."""
+    if 'watch?v=' in url:
+        return url.split('watch?v=', 1)[1].split('&', 1)[0]
+    if 'youtu.be/' in url:
+        return url.split('youtu.be/', 1)[1].split('?', 1)[0]
+    return url
+
+def _stream_url_expiry(stream_url):
+    """Return the unix time after which a cached stream URL should not be reused, or None if unknown."""
+    expire = urllib.parse.parse_qs(urllib.parse.urlsplit(stream_url).query).get("expire")
+    try:
+        return int(expire[0]) - STREAM_URL_MARGIN
+    except (TypeError, ValueError):
+        return None
+
+def _instance_record(row):
+    """Build an instance dict from a row selected as INSTANCE_COLUMNS."""
+    return {"id": row[0], "url": row[1], "rtsp_port": row[2], "http_port": row[3], "sink_name": row[4], "source_name": row[5], "pid": row[6]}
+
 class TabyController:
     def __init__(self, args):
         self.settings = {k: getattr(args, k, None) for k in ["script", "rtsp_base_port", "http_base_port", 
             "port_increment", "max_concurrent", "log_dir", "db_file", "audio_quality", 
-            "stream_bitrate", "stream_codec"]}
+            "stream_bitrate", "stream_codec", "network_caching"]}
         
         os.makedirs(self.settings["log_dir"], exist_ok=True)
+        self._port_cache = {}
+        self._children = {}
+        self._layouts = {}
+        
+        # Writes go through one connection owned by a background writer thread, reads through a
+        # separate read-only one; under WAL readers never wait on the writer's commits
+        self._conn = sqlite3.connect(self.settings["db_file"], isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._write_q = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close_db)
         self.init_db()
+        self._read_conn = sqlite3.connect(pathlib.Path(self.settings["db_file"]).absolute().as_uri() + "?mode=ro",
+            uri=True, isolation_level=None, check_same_thread=False)
         self.queue = self.load_queue()
+        cache_cutoff = time.time() - METADATA_TTL
+        self._meta_cache = {r[0]: r[1:] for r in self.db_op(
+            "SELECT video_id, title, stream_url, stream_format, fetched_time, url_expires FROM metadata_cache WHERE fetched_time > ?",
+            (cache_cutoff,), fetch=True)}
+        self.db_op("DELETE FROM metadata_cache WHERE fetched_time <= ?", (cache_cutoff,), wait=False)
         
         if hasattr(args, 'url') and args.url:
             for url in args.url:
@@ -21,68 +114,153 @@ class TabyController:
             self.load_playlist(args.playlist)
             
         self.instances = self.load_instances()
-        self.next_instance_id = max([i["id"] for i in self.instances], default=0) + 1
+        self.next_instance_id = self.db_op("SELECT COALESCE(MAX(id), 0) + 1 FROM instances", fetch=True)[0][0]
+        self._id_lock = threading.Lock()
         self.clean_instances()
         self.print_status()
     
-    def db_op(self, query, params=(), fetch=False):
-        with sqlite3.connect(self.settings["db_file"]) as conn:
-            c = conn.cursor()
-            c.execute(query, params)
+    def db_op(self, query, params=(), fetch=False, wait=True):
+        if query.lstrip().upper().startswith("SELECT"):
+            c = self._read_conn.execute(query, params)
+            return c.fetchall() if fetch else None
+        
+        def write(conn):
+            c = conn.execute(query, params)
             return c.fetchall() if fetch else (c.lastrowid if query.lstrip().upper().startswith("INSERT") else None)
+        return self.db_write(write, wait)
+    
+    def db_write(self, fn, wait=True):
+        """Run fn(conn) on the writer thread and return its result; with wait=False return immediately."""
+        future = concurrent.futures.Future()
+        self._write_q.put((fn, future))
+        if not wait:
+            future.add_done_callback(lambda f: f.exception() and print(f"Database error: {f.exception()}"))
+            return None
+        return future.result()
+    
+    def _writer_loop(self):
+        while True:
+            # Fold everything already queued into one transaction: one commit, one fsync
+            batch = [self._write_q.get()]
+            while True:
+                try:
+                    batch.append(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
+            jobs = [job for job in batch if job is not None]
+            
+            results = []
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                for fn, future in jobs:
+                    # Each job is its own savepoint so a failing one doesn't leave half its writes behind
+                    self._conn.execute("SAVEPOINT job")
+                    try:
+                        results.append((future, fn(self._conn), None))
+                        self._conn.execute("RELEASE job")
+                    except Exception as e:
+                        self._conn.execute("ROLLBACK TO job")
+                        self._conn.execute("RELEASE job")
+                        results.append((future, None, e))
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                results = [(future, None, e) for fn, future in jobs]
+            
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            if len(jobs) != len(batch):
+                return
+    
+    def close_db(self):
+        self._write_q.put(None)
+        self._writer.join()
+        self._conn.close()
+        self._read_conn.close()
     
     def init_db(self):
         self.db_op('CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY, url TEXT NOT NULL, added_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
         self.db_op('CREATE TABLE IF NOT EXISTS instances (id INTEGER PRIMARY KEY, url TEXT NOT NULL, rtsp_port INTEGER, http_port INTEGER, sink_name TEXT, source_name TEXT, pid INTEGER, started_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+        self.db_op('CREATE TABLE IF NOT EXISTS metadata_cache (video_id TEXT PRIMARY KEY, title TEXT NOT NULL, stream_url TEXT, stream_format TEXT, fetched_time REAL NOT NULL, url_expires REAL)')
     
     def load_queue(self):
-        return [{"id": r[0], "url": r[1]} for r in self.db_op("SELECT id, url FROM queue ORDER BY id", fetch=True)]
+        return {r[0]: {"id": r[0], "url": r[1]} for r in self.db_op("SELECT id, url FROM queue ORDER BY id", fetch=True)}
     
     def load_instances(self):
-        return [{"id": r[0], "url": r[1], "rtsp_port": r[2], "http_port": r[3], "sink_name": r[4], "source_name": r[5], "pid": r[6]} 
-                for r in self.db_op("SELECT id, url, rtsp_port, http_port, sink_name, source_name, pid FROM instances", fetch=True)]
+        return {r[0]: _instance_record(r) for r in self.db_op(f"SELECT {INSTANCE_COLUMNS} FROM instances ORDER BY id", fetch=True)}
     
     def add_to_queue(self, url):
         if not url.startswith(('http://', 'https://')):
             print(f"Invalid URL format: {url}")
             return False
             
-        queue_id = self.db_op("INSERT INTO queue (url) VALUES (?)", (url,))
-        self.queue.append({"id": queue_id, "url": url})
+        queue_id = self.db_op(SQL_INSERT_QUEUE, (url,))
+        self.queue[queue_id] = {"id": queue_id, "url": url}
         print(f"Added to queue: {url}")
         return True
     
     def remove_from_queue(self, queue_id):
-        self.db_op("DELETE FROM queue WHERE id = ?", (queue_id,))
-        self.queue = [item for item in self.queue if item["id"] != queue_id]
+        self.db_op(SQL_DELETE_QUEUE, (queue_id,), wait=False)
+        self.queue.pop(queue_id, None)
     
     def load_playlist(self, playlist_file):
         try:
-            with open(playlist_file, 'r') as f:
-                for line in f:
-                    url = line.strip()
-                    if url and not url.startswith('#'):
-                        self.add_to_queue(url)
-            print(f"Loaded {playlist_file}")
+            def ingest(conn):
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM queue").fetchone()[0]
+                conn.executemany(SQL_INSERT_QUEUE, _playlist_iter(playlist_file))
+                return conn.execute("SELECT id, url FROM queue WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+            
+            # One writer job, so one transaction for the whole file and contiguous new ids
+            added = self.db_write(ingest)
+            
+            self.queue.update((queue_id, {"id": queue_id, "url": url}) for queue_id, url in added)
+            print(f"Loaded {len(added)} URLs from {playlist_file}")
         except Exception as e:
             print(f"Error loading playlist: {e}")
     
     def check_port_availability(self, port):
         """Check if a port is available for use."""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            return s.connect_ex(('localhost', port)) != 0
+        cached = self._port_cache.get(port)
+        if cached and time.monotonic() - cached[0] < PORT_CHECK_TTL:
+            return cached[1]
+        
+        # A bind probe is one syscall: no handshake, no TIME_WAIT left behind. VLC listens on every
+        # interface and RTSP can carry data over UDP, so the port must be free for both on the wildcard address
+        available = True
+        for sock_type in (socket.SOCK_STREAM, socket.SOCK_DGRAM):
+            with socket.socket(socket.AF_INET, sock_type) as s:
+                if sock_type == socket.SOCK_STREAM:
+                    # Lets TIME_WAIT leftovers pass; on UDP it would also let shared bound ports pass
+                    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    s.bind(('', port))
+                except OSError:
+                    available = False
+                    break
+        
+        self._port_cache[port] = (time.monotonic(), available)
+        return available
     
-    def set_pulseaudio_device_name(self, device_name, description, is_source=False):
+    def set_pulseaudio_device_names(self, devices):
+        """Set device.description for each (device_name, description, is_source) with a single pacmd run."""
         try:
-            # Create a safe description for PulseAudio
-            safe_description = re.sub(r'[^\w\s\-_\.,]', '', description).replace(" ", "_")
-            
-            # Create the command with proper quoting
-            device_type = "source" if is_source else "sink"
-            cmd = f"pacmd update-{device_type}-proplist {device_name} device.description={safe_description}"
+            commands = []
+            for device_name, description, is_source in devices:
+                # Create a safe description for PulseAudio
+                if description.isascii():
+                    safe_description = description.encode("ascii").translate(SAFE_DESCRIPTION_TABLE, SAFE_DESCRIPTION_DROP).decode("ascii")
+                else:
+                    safe_description = SAFE_WHITESPACE_RE.sub('_', SAFE_DESCRIPTION_RE.sub('', description))
+                
+                device_type = "source" if is_source else "sink"
+                commands.append(f"update-{device_type}-proplist {device_name} device.description={safe_description}\n")
             
-            # Execute the command
-            subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
+            # pacmd reads commands from stdin when given none, so one process (and no shell) does every update
+            subprocess.run(["pacmd"], input="".join(commands), check=True, capture_output=True, text=True)
             return True
         except subprocess.CalledProcessError as e:
             print(f"PulseAudio command failed: {e.stderr if hasattr(e, 'stderr') else str(e)}")
@@ -91,10 +269,92 @@ class TabyController:
             print(f"Error setting device name: {e}")
             return False
     
-    def start_taby(self, url, instance_id):
+    def get_metadata(self, url):
+        """Return (title, stream_url) for url, from the metadata cache or a single yt-dlp call.
+        
+        Entries are keyed by video id and kept for METADATA_TTL. The stream URL is only reused for the
+        format selector it was resolved with and until its own expire= time; otherwise it is None and
+        taby.sh resolves a fresh one itself.
+        """
+        video_id = _video_id(url)
+        stream_format = self.settings["audio_quality"]
+        cached = self._cached_metadata(video_id, stream_format)
+        if cached is not None:
+            return cached
+        
+        info = json.loads(subprocess.check_output(
+            ["yt-dlp", *YTDLP_FAST_ARGS, "-f", stream_format, "-J", "--no-playlist", url], text=True))
+        return self._store_metadata(video_id, info, stream_format)
+    
+    def prefetch_metadata(self, urls):
+        """Fill the metadata cache for several URLs with one yt-dlp process, paying its start-up once."""
+        stream_format = self.settings["audio_quality"]
+        missing = {}
+        for url in urls:
+            video_id = _video_id(url)
+            if self._cached_metadata(video_id, stream_format) is None:
+                missing[video_id] = url
+        if len(missing) < 2:
+            return
+        
+        # -J prints one JSON document per URL and nothing for failed ones, so match each back to the URL
+        # it came from; _video_id can't parse every URL form, and those are keyed by the URL itself
+        by_url = {url: video_id for video_id, url in missing.items()}
+        result = subprocess.run(["yt-dlp", *YTDLP_FAST_ARGS, "-f", stream_format, "-J", "--no-playlist",
+            "--ignore-errors", *missing.values()], capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            try:
+                info = json.loads(line)
+            except ValueError:
+                continue
+            video_id = by_url.get(info.get("original_url"))
+            if video_id is not None:
+                self._store_metadata(video_id, info, stream_format)
+    
+    def _prefetch_quietly(self, urls):
+        try:
+            self.prefetch_metadata(urls)
+        except Exception as e:
+            print(f"Error prefetching metadata: {e}")
+    
+    def _cached_metadata(self, video_id, stream_format):
+        now = time.time()
+        cached = self._meta_cache.get(video_id)
+        if cached is None or now - cached[3] >= METADATA_TTL:
+            return None
+        title, stream_url, cached_format, _, url_expires = cached
+        usable = cached_format == stream_format and url_expires and now < url_expires
+        return title, stream_url if usable else None
+    
+    def _store_metadata(self, video_id, info, stream_format):
+        title = info["title"]
+        stream_url = info.get("url") or next((fmt.get("url") for fmt in info.get("requested_formats", [])), None)
+        url_expires = _stream_url_expiry(stream_url) if stream_url else None
+        
+        entry = (title, stream_url if url_expires else None, stream_format, time.time(), url_expires)
+        self._meta_cache[video_id] = entry
+        self.db_op("INSERT OR REPLACE INTO metadata_cache VALUES (?, ?, ?, ?, ?, ?)", (video_id,) + entry, wait=False)
+        return title, stream_url
+    
+    def clear_cache(self):
+        self.db_op("DELETE FROM metadata_cache")
+        self._meta_cache.clear()
+        print("Metadata cache cleared")
+    
+    def instance_layout(self, instance_id):
+        """Return (rtsp_port, http_port, sink_name, source_name) for an instance id, computed once."""
+        layout = self._layouts.get(instance_id)
+        if layout is None:
+            offset = instance_id * self.settings["port_increment"]
+            layout = (self.settings["rtsp_base_port"] + offset, self.settings["http_base_port"] + offset,
+                f"ts_sink_{instance_id}", f"TS_Bot_{instance_id}")
+            self._layouts[instance_id] = layout
+        return layout
+    
+    def start_taby(self, url, instance_id, pending_rows=None):
+        """Launch taby.sh for url; the instance row is written now, or appended to pending_rows if given."""
         try:
-            rtsp_port = self.settings["rtsp_base_port"] + (instance_id * self.settings["port_increment"])
-            http_port = self.settings["http_base_port"] + (instance_id * self.settings["port_increment"])
+            rtsp_port, http_port, sink_name, source_name = self.instance_layout(instance_id)
             
             # Check port availability
             if not self.check_port_availability(rtsp_port):
@@ -104,48 +364,56 @@ class TabyController:
                 print(f"HTTP port {http_port} is already in use")
                 return False
                 
-            sink_name = f"ts_sink_{instance_id}"
-            source_name = f"TS_Bot_{instance_id}"
             log_file = os.path.join(self.settings["log_dir"], f"taby_{instance_id}_{int(time.time())}.log")
             
             print(f"Starting Taby instance {instance_id} for {url}")
             
-            # Get video title first
+            # Get video title (and, when yt-dlp had to be asked anyway, the stream URL) first
+            stream_url = None
             try:
-                title = subprocess.check_output(["yt-dlp", "--get-title", url], text=True).strip()
+                title, stream_url = self.get_metadata(url)
                 if len(title) > 30:
                     title = title[:27] + "..."
             except Exception as e:
                 print(f"Error getting video title: {e}")
                 title = f"YouTube Stream {instance_id}"
             
+            argv = [
+                self.settings["script"], url,
+                "--rtsp-port", str(rtsp_port),
+                "--http-port", str(http_port),
+                "--sink-name", sink_name,
+                "--source-name", source_name,
+                "--audio-quality", self.settings["audio_quality"],
+                "--stream-bitrate", str(self.settings["stream_bitrate"]),
+                "--stream-codec", self.settings["stream_codec"],
+                "--network-caching", str(self.settings["network_caching"])
+            ]
+            if stream_url:
+                argv += ["--stream-url", stream_url]
+            
             with open(log_file, 'w') as f:
-                process = subprocess.Popen([
-                    self.settings["script"], url,
-                    "--rtsp-port", str(rtsp_port),
-                    "--http-port", str(http_port),
-                    "--sink-name", sink_name,
-                    "--source-name", source_name,
-                    "--audio-quality", self.settings["audio_quality"],
-                    "--stream-bitrate", str(self.settings["stream_bitrate"]),
-                    "--stream-codec", self.settings["stream_codec"]
-                ], stdout=f, stderr=f)
+                process = subprocess.Popen(argv, stdout=f, stderr=f)
+            self._children[instance_id] = process
             
-            self.db_op("INSERT INTO instances VALUES (?,?,?,?,?,?,?,CURRENT_TIMESTAMP)",
-                (instance_id, url, rtsp_port, http_port, sink_name, source_name, process.pid))
+            row = (instance_id, url, rtsp_port, http_port, sink_name, source_name, process.pid)
+            if pending_rows is None:
+                self.db_op(SQL_INSERT_INSTANCE, row)
+            else:
+                pending_rows.append(row)
             
-            self.instances.append({
+            self.instances[instance_id] = {
                 "id": instance_id, "url": url, "rtsp_port": rtsp_port, "http_port": http_port,
                 "sink_name": sink_name, "source_name": source_name, "pid": process.pid
-            })
+            }
             
             # Update PulseAudio device descriptions with video title
-            time.sleep(2)  # Wait for PulseAudio to create the devices
+            if not self._wait_for_devices(process, sink_name, source_name):
+                print(f"PulseAudio devices for instance {instance_id} did not appear")
             try:
-                self.set_pulseaudio_device_name(sink_name, title)
-                self.set_pulseaudio_device_name(f"{sink_name}.monitor", f"Monitor of {title}", True)
-                self.set_pulseaudio_device_name(source_name, title, True)
-                print(f"Updated device names to: {title}")
+                if self.set_pulseaudio_device_names([(sink_name, title, False),
+                        (f"{sink_name}.monitor", f"Monitor of {title}", True), (source_name, title, True)]):
+                    print(f"Updated device names to: {title}")
             except Exception as e:
                 print(f"Error updating device names: {e}")
             
@@ -154,8 +422,22 @@ class TabyController:
             print(f"Error starting instance: {e}")
             return False
     
+    def _wait_for_devices(self, process, sink_name, source_name):
+        """Poll until the sink monitor and virtual source of an instance exist, or the timeout passes."""
+        wanted = {f"{sink_name}.monitor", source_name}
+        deadline = time.monotonic() + PULSE_WAIT_TIMEOUT
+        while time.monotonic() < deadline and process.poll() is None:
+            try:
+                out = subprocess.run(["pactl", "list", "short", "sources"], capture_output=True, text=True).stdout
+                if wanted <= {fields[1] for fields in (line.split("\t") for line in out.splitlines()) if len(fields) > 1}:
+                    return True
+            except OSError:
+                return False
+            time.sleep(PULSE_POLL_INTERVAL)
+        return False
+    
     def stop_instance(self, instance_id):
-        instance = next((i for i in self.instances if i["id"] == instance_id), None)
+        instance = self.instances.get(instance_id)
         if not instance:
             print(f"Instance {instance_id} not found")
             return False
@@ -169,20 +451,75 @@ class TabyController:
             print(f"Error stopping instance {instance_id}: {e}")
             return False
             
-        self.db_op("DELETE FROM instances WHERE id = ?", (instance_id,))
-        self.instances = [i for i in self.instances if i["id"] != instance_id]
+        self.db_op(SQL_DELETE_INSTANCE, (instance_id,), wait=False)
+        self.instances.pop(instance_id, None)
         return True
     
-    def clean_instances(self):
-        for instance in list(self.instances):
+    def stop_all_instances(self):
+        # Take every row in one statement, so instances started by other controllers stop too
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            rows = self.db_op(f"DELETE FROM instances RETURNING {INSTANCE_COLUMNS}, started_time", fetch=True)
+        else:
+            rows = self.db_op(f"SELECT {INSTANCE_COLUMNS}, started_time FROM instances", fetch=True)
+            self.db_op("DELETE FROM instances")
+        
+        failed = []
+        for row in rows:
             try:
-                os.kill(instance["pid"], 0)
+                os.kill(row[6], signal.SIGTERM)
             except ProcessLookupError:
-                print(f"Cleaning up dead instance {instance['id']}")
-                self.db_op("DELETE FROM instances WHERE id = ?", (instance["id"],))
-                self.instances = [i for i in self.instances if i["id"] != instance["id"]]
+                pass
             except Exception as e:
-                print(f"Error checking instance {instance['id']}: {e}")
+                print(f"Error stopping instance {row[0]}: {e}")
+                failed.append(row)
+        
+        # Instances that could not be signalled keep their rows, so they can still be stopped later
+        if failed:
+            self.db_write(lambda conn: conn.executemany(
+                f"INSERT INTO instances ({INSTANCE_COLUMNS}, started_time) VALUES (?,?,?,?,?,?,?,?)", failed))
+        
+        print(f"Stopped {len(rows) - len(failed)} instances")
+        self.instances = {row[0]: _instance_record(row) for row in failed}
+        return not failed
+    
+    def clean_instances(self):
+        # Our own children are polled: exact, and it reaps them so they don't linger as zombies
+        exited = {iid for iid, process in list(self._children.items()) if process.poll() is not None}
+        for iid in exited:
+            del self._children[iid]
+        
+        # Instances left by an earlier controller fall back to one /proc listing on Linux,
+        # and to a kill(pid, 0) probe each elsewhere. The dict is snapshotted first: the GUI runs this
+        # on the Tk thread while start_next may be adding instances from its executor thread
+        unowned = [i for i in list(self.instances.values()) if i["id"] not in self._children and i["id"] not in exited]
+        live_pids = None
+        if unowned and sys.platform.startswith("linux"):
+            try:
+                live_pids = {int(name) for name in os.listdir('/proc') if name.isdigit()}
+            except FileNotFoundError:
+                pass
+        
+        dead_ids = [iid for iid in exited if iid in self.instances]
+        dead_ids += [i["id"] for i in unowned if not self._pid_alive(i["pid"], live_pids)]
+        for instance_id in dead_ids:
+            print(f"Cleaning up dead instance {instance_id}")
+        
+        if dead_ids:
+            self.db_op(f"DELETE FROM instances WHERE id IN ({','.join('?' * len(dead_ids))})", dead_ids, wait=False)
+            for instance_id in dead_ids:
+                self.instances.pop(instance_id, None)
+    
+    def _pid_alive(self, pid, live_pids):
+        if live_pids is not None:
+            return pid in live_pids
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except Exception as e:
+            print(f"Error checking process {pid}: {e}")
+            return True
     
     def start_next(self):
         if not self.queue:
@@ -194,13 +531,47 @@ class TabyController:
             return False
         
         # Fixed critical bug: Get the first item from the queue instead of the entire queue
-        next_item = self.queue[0]  # Fixed line - was incorrectly "next_item = self.queue"
-        if self.start_taby(next_item["url"], self.next_instance_id):
-            self.next_instance_id += 1
+        next_item = next(iter(self.queue.values()))
+        if self.start_taby(next_item["url"], self.allocate_instance_id()):
             self.remove_from_queue(next_item["id"])
             return True
         return False
     
+    def allocate_instance_id(self):
+        """Hand out the next instance id; safe to call from several threads at once."""
+        with self._id_lock:
+            instance_id = self.next_instance_id
+            self.next_instance_id += 1
+            return instance_id
+    
+    def fill_slots(self):
+        """Start queued streams until max_concurrent is reached, recording them in one transaction."""
+        to_start = list(itertools.islice(self.queue.values(), max(self.settings["max_concurrent"] - len(self.instances), 0)))
+        if not to_start:
+            return 0
+        
+        # Warm the metadata cache for the entries that will start next, alongside these starts
+        # rather than ahead of them, so later start_next calls find their titles cached
+        upcoming = [item["url"] for item in itertools.islice(self.queue.values(), len(to_start), len(to_start) + self.settings["max_concurrent"])]
+        if upcoming:
+            threading.Thread(target=self._prefetch_quietly, args=(upcoming,), daemon=True).start()
+        
+        # Each start mostly waits on its own yt-dlp lookup and on PulseAudio, so bring them all up at once
+        rows = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(to_start)) as pool:
+            results = list(pool.map(lambda item: self.start_taby(item["url"], self.allocate_instance_id(), rows), to_start))
+        self.instances = dict(sorted(self.instances.items()))
+        
+        started = [(item["id"],) for item, ok in zip(to_start, results) if ok]
+        if started:
+            for (queue_id,) in started:
+                self.queue.pop(queue_id, None)
+            def record(conn):
+                conn.executemany(SQL_INSERT_INSTANCE, rows)
+                conn.executemany(SQL_DELETE_QUEUE, started)
+            self.db_write(record)
+        return len(started)
+    
     def print_status(self):
         print(f"\n=== Taby Controller Status ===\nActive: {len(self.instances)}/{self.settings['max_concurrent']} | Queue: {len(self.queue)}\n")
     
@@ -210,11 +581,11 @@ class TabyController:
             return
         
         print("\n=== Active Instances ===")
-        for i in self.instances:
+        for i in self.instances.values():
             print(f"ID: {i['id']}\n  URL: {i['url']}\n  RTSP: rtsp://localhost:{i['rtsp_port']}/audio\n  HTTP: http://localhost:{i['http_port']}/stream.ogg")
     
     def show_queue(self):
-        print("\n=== Queue ===\n" + "\n".join([f"{i+1}. {item['url']}" for i, item in enumerate(self.queue)] or ["Empty"]) + "\n")
+        print("\n=== Queue ===\n" + "\n".join([f"{i+1}. {item['url']}" for i, item in enumerate(self.queue.values())] or ["Empty"]) + "\n")
     
     def interactive_mode(self):
         print("Taby Controller Interactive Mode\nType 'help' for commands")
@@ -224,30 +595,111 @@ class TabyController:
             "queue": self.show_queue,
             "clean": self.clean_instances,
             "start-next": self.start_next,
-            "help": lambda: print("\nCommands:\n  list - Show instances\n  queue - Show queue\n  add URL - Add URL\n  clean - Remove dead instances\n  stop ID - Stop instance\n  stop-all - Stop all\n  start-next - Start next\n  exit/quit - Exit\n")
+            "clear-cache": self.clear_cache,
+            "help": lambda: print("\nCommands:\n  list - Show instances\n  queue - Show queue\n  add URL - Add URL\n  clean - Remove dead instances\n  stop ID - Stop instance\n  stop-all - Stop all\n  start-next - Start next\n  clear-cache - Forget cached titles and stream URLs\n  exit/quit - Exit\n")
         }
         
+        # Wait on stdin and a SIGCHLD wakeup pipe instead of blocking in input(),
+        # so instances that exit are cleaned up right away rather than on the next command
+        sel = selectors.DefaultSelector()
+        stdin_fd = sys.stdin.fileno()
+        wake_r = wake_w = None
+        signals_installed = False
+        try:
+            try:
+                sel.register(stdin_fd, selectors.EVENT_READ)
+            except PermissionError:
+                # Regular files and /dev/null (nohup, systemd) can't be polled; read them line by line
+                self._readline_loop(cmds)
+                return
+            
+            wake_r, wake_w = os.pipe()
+            os.set_blocking(wake_r, False)
+            os.set_blocking(wake_w, False)
+            sel.register(wake_r, selectors.EVENT_READ)
+            old_handler = signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+            old_wakeup_fd = signal.set_wakeup_fd(wake_w)
+            signals_installed = True
+            
+            pending = b""
+            show_prompt = True
+            while True:
+                try:
+                    if show_prompt:
+                        print("> ", end="", flush=True)
+                        show_prompt = False
+                    
+                    ready = {key.fd for key, _ in sel.select(timeout=REPL_POLL_INTERVAL)}
+                    if wake_r in ready or not ready:
+                        try:
+                            while os.read(wake_r, 512):
+                                pass
+                        except BlockingIOError:
+                            pass
+                        before = len(self.instances)
+                        self.clean_instances()
+                        show_prompt = len(self.instances) != before
+                    if stdin_fd not in ready:
+                        continue
+                    
+                    data = os.read(stdin_fd, 4096)
+                    if not data:
+                        # A last command without a trailing newline still runs
+                        if pending.strip():
+                            self.run_command(pending.decode(errors="replace").strip(), cmds)
+                        break
+                    show_prompt = True
+                    *lines, pending = (pending + data).split(b"\n")
+                    for line in lines:
+                        if not self.run_command(line.decode(errors="replace").strip(), cmds):
+                            return
+                except KeyboardInterrupt:
+                    print("\nUse 'exit' to quit")
+                    show_prompt = True
+                except Exception as e:
+                    print(f"Error: {e}")
+                    show_prompt = True
+        finally:
+            if signals_installed:
+                signal.set_wakeup_fd(old_wakeup_fd)
+                signal.signal(signal.SIGCHLD, old_handler)
+            sel.close()
+            if wake_r is not None:
+                os.close(wake_r)
+                os.close(wake_w)
+    
+    def _readline_loop(self, cmds):
+        """Blocking prompt for a stdin that can't be polled; ends at EOF."""
         while True:
             try:
-                cmd = input("> ").strip()
-                if not cmd: continue
-                if cmd in ["exit", "quit"]: break
-                
-                if cmd in cmds:
-                    cmds[cmd]()
-                elif cmd.startswith("stop "):
-                    try: self.stop_instance(int(cmd.split(" ")[1]))
-                    except: print("Invalid instance ID")
-                elif cmd == "stop-all":
-                    for instance in list(self.instances): self.stop_instance(instance["id"])
-                elif cmd.startswith("add "):
-                    self.add_to_queue(cmd[4:].strip())
-                else:
-                    print(f"Unknown command: {cmd}")
+                print("> ", end="", flush=True)
+                line = sys.stdin.readline()
+                if not line:
+                    break
+                if not self.run_command(line.strip(), cmds):
+                    return
             except KeyboardInterrupt:
                 print("\nUse 'exit' to quit")
             except Exception as e:
                 print(f"Error: {e}")
+    
+    def run_command(self, cmd, cmds):
+        """Run one interactive command; returns False when the user asked to exit."""
+        if not cmd: return True
+        if cmd in ["exit", "quit"]: return False
+        
+        if cmd in cmds:
+            cmds[cmd]()
+        elif cmd.startswith("stop "):
+            try: self.stop_instance(int(cmd.split(" ")[1]))
+            except: print("Invalid instance ID")
+        elif cmd == "stop-all":
+            self.stop_all_instances()
+        elif cmd.startswith("add "):
+            self.add_to_queue(cmd[4:].strip())
+        else:
+            print(f"Unknown command: {cmd}")
+        return True
 
 def main():
     parser = argparse.ArgumentParser(description="Taby Controller - Manage multiple YouTube audio streams")
@@ -261,9 +713,10 @@ def main():
     parser.add_argument("--max-concurrent", type=int, default=5, help="Max instances (default: 5)")
     parser.add_argument("--log-dir", default="/tmp/taby-controller-logs", help="Log directory")
     parser.add_argument("--db-file", default="/tmp/taby-controller.db", help="Database file")
-    parser.add_argument("--audio-quality", default="bestaudio", help="Audio quality (default: bestaudio)")
+    parser.add_argument("--audio-quality", default="bestaudio", help="Audio quality (default: bestaudio; DASH-only formats are skipped for faster lookups)")
     parser.add_argument("--stream-bitrate", type=int, default=128, help="Stream bitrate (default: 128)")
     parser.add_argument("--stream-codec", default="mp3", help="Stream codec (default: mp3)")
+    parser.add_argument("--network-caching", type=int, default=1000, help="Player input buffer in ms (default: 1000)")
     
     args = parser.parse_args()
     controller = TabyController(args)
@@ -272,8 +725,7 @@ def main():
         controller.list_instances()
         return
     
-    while len(controller.instances) < controller.settings["max_concurrent"] and controller.queue:
-        controller.start_next()
+    controller.fill_slots()
     
     controller.interactive_mode()
 